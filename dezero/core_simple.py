@@ -1,10 +1,18 @@
 import numpy as np
-import heapq as hq
 import weakref
 import contextlib
+from collections import deque
+
+try:
+    import numexpr as _ne
+except ImportError:
+    _ne = None
+
+_NE_MIN_SIZE = 4096 # 이보다 작으면 numexpr 호출 오버헤드가 더 큼
 
 class Config:
     enable_backprop = True
+    default_dtype = None # 예: np.float32 설정 시 생성되는 배열을 강제 캐스팅
 
 @contextlib.contextmanager
 def using_config(name, value):
@@ -16,11 +24,18 @@ def using_config(name, value):
         setattr(Config, name, old_value)
 
 def numerical_diff(f, x, eps=1e-4):
-    return (f(Variable(x.data+eps)).data - f(Variable(x.data-eps)).data) / (2*eps)
-
-def as_array(x):
+    xs = x.data if isinstance(x, Variable) else as_array(x) # ndarray 배치도 허용
+    y1 = f(Variable(as_array(xs + eps))).data
+    y0 = f(Variable(as_array(xs - eps))).data
+    return (y1 - y0) * (0.5 / eps)
+
+def as_array(x, dtype=None):
+    if dtype is None:
+        dtype = Config.default_dtype
     if np.isscalar(x):
-        return np.array(x)
+        return np.array(x, dtype=dtype)
+    if dtype is not None and x.dtype != dtype:
+        return x.astype(dtype)
     return x
 
 def as_variable(obj):
@@ -31,18 +46,89 @@ def as_variable(obj):
 def no_grad():
     return using_config('enable_backprop', False)
 
+_weakref_ref = weakref.ref
+
+_graph_version = 0 # Function.__call__ 마다 증가, topo 캐시 무효화용
+
+def _toposort(root):
+    if root is None:
+        return []
+    # Kahn's algorithm: pending[f] = f의 출력을 소비하는 엣지 수
+    pending = {root: 0}
+    stack = [root]
+    while stack:
+        f = stack.pop()
+        for x in f.inputs:
+            c = x.creator
+            if c is None:
+                continue
+            if c in pending:
+                pending[c] += 1
+            else:
+                pending[c] = 1
+                stack.append(c)
+    order = []
+    queue = deque([root])
+    while queue:
+        f = queue.popleft()
+        order.append(f)
+        for x in f.inputs:
+            c = x.creator
+            if c is None:
+                continue
+            pending[c] -= 1
+            if pending[c] == 0:
+                queue.append(c)
+    return order
+
+def _run_backward(funcs, f_inputs, f_outputs, retain_grad):
+    # 역전파의 최내곽 루프. 노드당 파이썬 오버헤드를 줄이려고
+    # 전역/빌트인 조회를 지역 변수로 끌어올리고, inputs/outputs는
+    # 속성 추적 대신 병렬 시퀀스(SoA)로 순회한다
+    _isinstance = isinstance
+    _tuple = tuple
+    _zip = zip
+    _add = np.add
+    owned = set() # 누적으로 새로 만들어져 해당 변수만 참조하는 grad의 id(x)
+    for f, inputs, outputs in _zip(funcs, f_inputs, f_outputs):
+        if len(outputs) == 1:
+            # 대부분의 함수는 출력이 하나 — 리스트 생성/언패킹 생략
+            gxs = f.backward(outputs[0]().grad)
+        else:
+            gxs = f.backward(*[output().grad for output in outputs])
+        if not _isinstance(gxs, _tuple):
+            gxs = (gxs, )
+        for x, gx in _zip(inputs, gxs):
+            if x.grad is None:
+                x.grad = gx
+            elif (id(x) in owned and x.grad is not gx
+                  and type(x.grad) is np.ndarray and x.grad.shape == gx.shape):
+                _add(x.grad, gx, out=x.grad) # 새 배열 할당 없이 누적
+            else:
+                # Add/Sub는 gy를 그대로 통과시키므로 첫 누적은 반드시
+                # 새 배열을 만들어 다른 변수와의 공유를 끊는다
+                x.grad = x.grad + gx
+                owned.add(id(x))
+        if not retain_grad:
+            for y in outputs:
+                y().grad = None
+
 class Variable:
     __array_priority__ = 200
+    __slots__ = ('name', 'data', 'grad', 'creator', 'generation',
+                 '_topo_cache', 'const', '__weakref__')
 
-    def __init__(self, data, name=None):
+    def __init__(self, data, name=None, const=False):
         if data is not None:
             if not isinstance(data, np.ndarray):
                 raise TypeError(f'{type(data)}는 지원하지 않습니다.')
         self.name = name
         self.data = data
+        self.const = const
         self.grad = None
         self.creator = None
         self.generation = 0
+        self._topo_cache = None
 
     def __len__(self):
         return len(self.data)
@@ -72,56 +158,84 @@ class Variable:
     def cleargrad(self):
         self.grad = None
 
-    def backward(self, retain_grad=False):
+    def astype(self, dtype):
+        return Variable(self.data.astype(dtype), name=self.name)
+
+    def backward(self, retain_grad=False, release=False):
         if self.grad is None:
-            self.grad = np.ones_like(self.data)
-        seen_set = set()
-        funcs = []
-
-        def add_func(f):
-            if f not in seen_set:
-                seen_set.add(f)
-                hq.heappush(funcs, f)
-        
-        add_func(self.creator)
-
-        while funcs:
-            f = hq.heappop(funcs)
-            gys = [output().grad for output in f.outputs]
-            gxs = f.backward(*gys)
-            if not isinstance(gxs, tuple):
-                gxs = (gxs, )
-            for x, gx in zip(f.inputs, gxs):
-                x.grad = gx if x.grad is None else gx + x.grad
-                if x.creator is not None:
-                    add_func(x.creator)
-            if not retain_grad:
-                for y in f.outputs:
-                    y().grad = None
+            dtype = self.data.dtype
+            if dtype == np.float16:
+                # 활성값이 half여도 grad 누적은 float32로 (타입 승격이 유지해 줌)
+                dtype = np.float32
+            if self.data.ndim == 0:
+                # 스칼라 손실이면 브로드캐스트되는 0차원 1.0이면 충분
+                self.grad = np.asarray(1.0, dtype=dtype)
+            else:
+                self.grad = np.ones(self.data.shape, dtype=dtype)
+        cache = self._topo_cache
+        if cache is not None and cache[0] == _graph_version:
+            _, funcs, f_inputs, f_outputs = cache
+        else:
+            funcs = _toposort(self.creator)
+            f_inputs = [f.inputs for f in funcs]
+            f_outputs = [f.outputs for f in funcs]
+            self._topo_cache = (_graph_version, funcs, f_inputs, f_outputs)
+
+        _run_backward(funcs, f_inputs, f_outputs, retain_grad)
+
+        if release:
+            # 소비가 끝난 그래프를 버려 순전파 활성값을 즉시 회수
+            # (루프 도중에 풀면 아직 처리 전인 creator가 weakref로 읽을
+            #  출력 grad까지 사라질 수 있어 패스가 끝난 뒤에 해제)
+            for f in funcs:
+                f.inputs = None
+                f.outputs = None
+            self._topo_cache = None
+            self.creator = None
 
 class Function:
+    __slots__ = ('generation', 'inputs', 'outputs')
+
+    _foldable = False # 인스턴스 파라미터가 키에 전부 들어가는 순수 함수만 True
+    _const_cache = {} # key -> (출력 weakref, 입력 강참조 튜플)
+
     def __call__(self, *inputs):
-        inputs = [as_variable(x) for x in inputs]
+        if not all(type(x) is Variable for x in inputs):
+            inputs = [as_variable(x) for x in inputs]
+        if self._foldable and inputs and all(x.const and x.creator is None for x in inputs):
+            key = (self.__class__, tuple(id(x) for x in inputs),
+                   getattr(self, 'c', None)) # Pow의 지수가 유일한 파라미터
+            entry = Function._const_cache.get(key)
+            if entry is not None:
+                cached = entry[0]()
+                if cached is not None:
+                    return cached
+        else:
+            key = None
         xs = [x.data for x in inputs]
         ys = self.forward(*xs)
-        if not isinstance(ys, tuple):
-            ys = (ys, )
-        outputs = [Variable(as_array(y)) for y in ys]
-        
+        if isinstance(ys, tuple):
+            outputs = [Variable(y if type(y) is np.ndarray else as_array(y)) for y in ys]
+        else:
+            outputs = [Variable(ys if type(ys) is np.ndarray else as_array(ys))]
+
         if Config.enable_backprop:
+            global _graph_version
+            _graph_version += 1
             self.generation = max([x.generation for x in inputs])
             for output in outputs:
                 output.set_creator(self)
-            self.inputs = inputs
-            self.outputs = [weakref.ref(output) for output in outputs]
-
+            self.inputs = tuple(inputs)
+            self.outputs = tuple(map(_weakref_ref, outputs))
+
+        if key is not None and len(outputs) == 1:
+            # 입력을 강참조로 함께 보관해 id 재사용에 의한 잘못된 적중을 막고,
+            # 출력이 수거되면 콜백으로 엔트리를 비운다
+            out = outputs[0]
+            ref = _weakref_ref(out, lambda r, _k=key: Function._const_cache.pop(_k, None))
+            Function._const_cache[key] = (ref, tuple(inputs))
         return outputs if len(outputs) > 1 else outputs[0]
 
-    def __lt__(self, other): # this for generation heap
-        if self.generation > other.generation:
-            return True
-        return False
-
     def __str__(self):
         return f'{self.generation} gen : [{__class__}], {id(self)}'
 
@@ -132,58 +246,109 @@ class Function:
         raise NotImplementedError()
 
 class Neg(Function):
+    __slots__ = ()
+    _foldable = True
     def forward(self, x):
-        return -1 * x
+        return np.negative(x)
     def backward(self, gy):
-        return -1*gy
+        return np.negative(gy)
 
 class Pow(Function):
+    __slots__ = ('c', '_fwd', '_bwd')
+    _foldable = True
     def __init__(self, c):
         self.c = c
+        # 작은 지수는 np.power 대신 곱셈/제곱근으로 특수화
+        if c == 1:
+            self._fwd = lambda x: x
+            self._bwd = lambda x, gy: gy
+        elif c == 2:
+            self._fwd = lambda x: x*x
+            self._bwd = lambda x, gy: 2*x*gy
+        elif c == 3:
+            self._fwd = lambda x: x*x*x
+            self._bwd = lambda x, gy: 3*x*x*gy
+        elif c == -1:
+            self._fwd = lambda x: 1.0/x
+            self._bwd = lambda x, gy: -gy/(x*x)
+        elif c == 0.5:
+            self._fwd = lambda x: np.sqrt(x)
+            self._bwd = lambda x, gy: 0.5*gy/np.sqrt(x)
+        else:
+            self._fwd = None
+            self._bwd = None
     def forward(self, x):
+        if self._fwd is not None:
+            return self._fwd(x)
         return x**self.c
     def backward(self, gy):
         x = self.inputs[0].data
+        if self._bwd is not None:
+            return self._bwd(x, gy)
         c = self.c
+        if _ne is not None and x.size >= _NE_MIN_SIZE:
+            return _ne.evaluate('gy * c * x ** (c - 1)')
         return gy*c*x**(c-1)
 
 class Square(Function):
+    __slots__ = ()
+    _foldable = True
     def forward(self, x):
         return x**2
     def backward(self, gy):
         x = self.inputs[0].data
+        if _ne is not None and x.size >= _NE_MIN_SIZE:
+            return _ne.evaluate('2 * x * gy')
         return 2 * x * gy
 
 class Exp(Function):
+    __slots__ = ('y',)
+    _foldable = True
     def forward(self, x):
-        return np.exp(x)
+        if _ne is not None and x.size >= _NE_MIN_SIZE:
+            y = _ne.evaluate('exp(x)')
+        else:
+            y = np.exp(x)
+        if Config.enable_backprop:
+            self.y = y # backward에서 exp 재계산 방지
+        return y
     def backward(self, gy):
-        return np.exp(self.inputs.data) * gy
+        return self.y * gy
 
 class Add(Function):
+    __slots__ = ()
+    _foldable = True
     def forward(self, x0, x1):
         return x0 + x1
     def backward(self, gy):
         return gy, gy
 
 class Mul(Function):
+    __slots__ = ()
+    _foldable = True
     def forward(self, x0, x1):
         return x0 * x1
     def backward(self, gy):
         x0, x1 = self.inputs[0].data, self.inputs[1].data
-        return x1*gy, x0*gy
+        return np.multiply(x1, gy), np.multiply(x0, gy)
 
 class Sub(Function):
+    __slots__ = ()
+    _foldable = True
     def forward(self, x0, x1):
         return x0 - x1
     def backward(self, gy):
-        return gy, -gy
+        return gy, np.negative(gy)
 
 class Div(Function):
+    __slots__ = ()
+    _foldable = True
     def forward(self, x0, x1):
         return x0 / x1
     def backward(self, gy):
         x0, x1 = self.inputs[0].data, self.inputs[1].data
+        if _ne is not None and x1.size >= _NE_MIN_SIZE:
+            return _ne.evaluate('gy / x1'), _ne.evaluate('(-x0 / x1 ** 2) * gy')
         return gy/x1, (-x0/x1**2)*gy
 
 def neg(x):
@@ -195,22 +360,28 @@ def square(x):
 def exp(x):
     return Exp()(x)
 def add(x, y):
-    y = as_array(y)
+    if not isinstance(y, Variable):
+        y = as_array(y)
     return Add()(x, y)
 def mul(x, y):
-    y = as_array(y)
+    if not isinstance(y, Variable):
+        y = as_array(y)
     return Mul()(x, y)
 def sub(x, y):
-    y = as_array(y)
+    if not isinstance(y, Variable):
+        y = as_array(y)
     return Sub()(x, y)
 def rsub(x, y):
-    y = as_array(y)
+    if not isinstance(y, Variable):
+        y = as_array(y)
     return Sub()(y, x)
 def div(x, y):
-    y = as_array(y)
+    if not isinstance(y, Variable):
+        y = as_array(y)
     return Div()(x, y)
 def rdiv(x, y):
-    y = as_array(y)
+    if not isinstance(y, Variable):
+        y = as_array(y)
     return Div()(y, x)
 
 def setup_variable():
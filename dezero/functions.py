@@ -2,8 +2,19 @@ import numpy as np
 from dezero import Function
 from dezero import as_variable
 
+try:
+    import numexpr as _ne
+except ImportError:
+    _ne = None
+
+_NE_MIN_SIZE = 4096 # 이보다 작으면 numexpr 호출 오버헤드가 더 큼
+
 class Sin(Function):
+    __slots__ = ()
+    _foldable = True
     def forward(self, x):
+        if _ne is not None and x.size >= _NE_MIN_SIZE:
+            return _ne.evaluate('sin(x)')
         return np.sin(x)
     def backward(self, gy):
         x, = self.inputs
@@ -13,7 +24,11 @@ def sin(x):
     return Sin()(x)
 
 class Cos(Function):
+    __slots__ = ()
+    _foldable = True
     def forward(self, x):
+        if _ne is not None and x.size >= _NE_MIN_SIZE:
+            return _ne.evaluate('cos(x)')
         return np.cos(x)
     def backward(self, gy):
         x, = self.inputs
@@ -23,28 +38,92 @@ def cos(x):
     return Cos()(x)
 
 class Tanh(Function):
+    __slots__ = ()
+    _foldable = True
     def forward(self, x):
+        if _ne is not None and x.size >= _NE_MIN_SIZE:
+            return _ne.evaluate('tanh(x)')
         return np.tanh(x)
     def backward(self, gy):
         y = self.outputs[0]()
-        return g * (1 - y*y)
+        return gy * (1 - y*y)
 
 def tanh(x):
     return Tanh()(x)
 
-'''
 class Sum(Function):
+    __slots__ = ('axis', 'keepdims', 'x_shape')
+    def __init__(self, axis=None, keepdims=False):
+        self.axis = axis
+        self.keepdims = keepdims
+    def forward(self, x):
+        self.x_shape = x.shape
+        # 중간 배열 없이 한 번에 축약
+        return np.add.reduce(x, axis=self.axis, keepdims=self.keepdims)
+    def backward(self, gy):
+        if self.axis is not None and not self.keepdims:
+            # 줄어든 축을 길이 1로 복원해 브로드캐스트 가능하게 만든다
+            axis = self.axis if isinstance(self.axis, tuple) else (self.axis,)
+            shape = list(self.x_shape)
+            for a in axis:
+                shape[a % len(self.x_shape)] = 1
+            gy = reshape(gy, tuple(shape))
+        return gy * np.ones(self.x_shape, dtype=gy.dtype)
+
+def sum(x, axis=None, keepdims=False):
+    return Sum(axis, keepdims)(x)
+
+class Transpose(Function):
+    __slots__ = ('axes',)
+    def __init__(self, axes=None):
+        self.axes = axes
     def forward(self, x):
-        self.shape = x.shape
-        return np.sum(x.data, keepdims=True)
+        return np.transpose(x, self.axes)
+    def backward(self, gy):
+        if self.axes is None:
+            return transpose(gy)
+        # 순방향 치환의 역치환으로 되돌린다
+        inv = tuple(np.argsort(self.axes))
+        return transpose(gy, inv)
+
+def transpose(x, axes=None):
+    return Transpose(axes)(x)
+
+def _swap_last_axes(x):
+    # matmul 전용: 배치 축은 두고 마지막 두 축만 교환
+    nd = len(x.shape)
+    if nd <= 2:
+        return transpose(x)
+    return transpose(x, tuple(range(nd - 2)) + (nd - 1, nd - 2))
+
+def _sum_to_shape(x, shape):
+    # 브로드캐스트로 늘어난 배치 축을 합산해 shape로 되돌린다
+    while len(x.shape) > len(shape):
+        x = sum(x, axis=0)
+    axes = tuple(i for i, s in enumerate(shape) if s == 1 and x.shape[i] != 1)
+    if axes:
+        x = sum(x, axis=axes, keepdims=True)
+    return x
+
+class MatMul(Function):
+    __slots__ = ()
+    def forward(self, x, W):
+        return np.matmul(x, W)
     def backward(self, gy):
-        return reshape(gy, self.shape)
+        x, W = self.inputs
+        gx = matmul(gy, _swap_last_axes(W))
+        gW = matmul(_swap_last_axes(x), gy)
+        if gx.shape != x.shape:
+            gx = _sum_to_shape(gx, x.shape)
+        if gW.shape != W.shape:
+            gW = _sum_to_shape(gW, W.shape)
+        return gx, gW
 
-def sum(x):
-    return Sum()(x)
-'''
+def matmul(x, W):
+    return MatMul()(x, W)
 
 class Reshape(Function):
+    __slots__ = ('shape', 'x_shape')
     def __init__(self, shape):
         self.shape = shape
     def forward(self, x):
@@ -1,6 +1,26 @@
 import os
 import subprocess
 
+_TMP_DIR = os.path.join(os.path.expanduser('~'), '.dezero')
+_GRAPH_PATH = os.path.join(_TMP_DIR, 'tmp_graph.dot')
+
+def dfs_match(root, pred):
+    # root에서 creator를 거슬러 올라가며 pred를 만족하는 변수를 찾으면 즉시 True
+    stack, seen = [root], set()
+    while stack:
+        n = stack.pop()
+        k = id(n)
+        if k in seen:
+            continue
+        seen.add(k)
+        if pred(n):
+            return True
+        c = n.creator
+        if c is not None:
+            for x in c.inputs:
+                stack.append(x)
+    return False
+
 def _dot_var(v, verbose=False):
     name = '' if v.name is None else v.name
     if verbose and v.data is not None:
@@ -10,49 +30,50 @@ def _dot_var(v, verbose=False):
     return f'{id(v)} [label="{name}", color=orange, style=filled]\n'
 
 def _dot_func(f):
-    txt = f'{id(f)} [label="{f.__class__.__name__}", color=lightblue, style=filled, shape=box]\n'
-    
+    id_f = id(f)
+    parts = [f'{id_f} [label="{f.__class__.__name__}", color=lightblue, style=filled, shape=box]\n']
+
     dot_edge = '{} -> {}\n'
     for x in f.inputs:
-        txt += dot_edge.format(id(x), id(f))
+        parts.append(dot_edge.format(id(x), id_f))
     for y in f.outputs:
-        txt += dot_edge.format(id(f), id(y()))
-    return txt
+        parts.append(dot_edge.format(id_f, id(y())))
+    return ''.join(parts)
 
 def get_dot_graph(output, verbose=True):
-    txt = ''
+    parts = []
     seen_set = set()
+    seen_vars = {id(output)} # 변수 라벨은 한 번만 출력
     funcs = []
 
     def add_func(f):
         if f not in seen_set:
             seen_set.add(f)
             funcs.append(f)
-    
+
     add_func(output.creator)
-    txt += _dot_var(output)
+    parts.append(_dot_var(output))
 
     while funcs:
         f = funcs.pop()
-        txt += _dot_func(f)
+        parts.append(_dot_func(f))
         for x in f.inputs:
-            txt += _dot_var(x, verbose=verbose)
+            if id(x) not in seen_vars:
+                seen_vars.add(id(x))
+                parts.append(_dot_var(x, verbose=verbose))
             if x.creator is not None:
                 add_func(x.creator)
 
-    return 'digraph g {\n' + txt + '}'
+    return 'digraph g {\n' + ''.join(parts) + '}'
 
 def plot_dot_graph(output, verbose=True, to_file='dot.png'):
     dot_graph = get_dot_graph(output, verbose)
-    tmp_dir = os.path.join(os.path.expanduser('~'), '.dezero')
-    if not os.path.exists(tmp_dir):
-        os.mkdir(tmp_dir)
-    graph_path = os.path.join(tmp_dir, 'tmp_graph.dot')
+    os.makedirs(_TMP_DIR, exist_ok=True)
 
-    with open(graph_path, 'w') as f:
+    with open(_GRAPH_PATH, 'w') as f:
         f.write(dot_graph)
-    
+
     extension = os.path.splitext(to_file)[1][1:]
-    cmd = f'dot {graph_path} -T {extension} -o {to_file}'
-    print(cmd)
-    subprocess.run(cmd, shell=True)
\ No newline at end of file
+    cmd = ['dot', _GRAPH_PATH, '-T', extension, '-o', to_file]
+    print(' '.join(cmd))
+    subprocess.run(cmd) # shell 포크 없이 직접 실행
\ No newline at end of file